@@ -2,10 +2,22 @@
 svdpatch.py
 """
 
-import pathlib
+import importlib
 
-from . import interrupts, makedeps, mmap, patch
+from ._version import __version__
 
-__version__ = open(pathlib.Path(__file__).parent / "VERSION").read().strip()
+# Submodules are imported on first access so that light-weight commands
+# don't pay for loading lxml, yaml and the patch engine.
+_SUBMODULES = ("interrupts", "makedeps", "mmap", "patch")
 
-del pathlib
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
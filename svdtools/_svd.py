@@ -0,0 +1,69 @@
+"""
+_svd.py
+SVD reading helpers shared by the svdtools commands.
+Licensed under the MIT and Apache 2.0 licenses. See LICENSE files for details.
+"""
+
+import lxml.etree as ET
+
+# SVDs don't declare custom entities or rely on xml:id, so skip entity
+# substitution and the ID table, and never touch the network.
+PARSE_OPTIONS = {
+    "resolve_entities": False,
+    "no_network": True,
+    "collect_ids": False,
+}
+
+# Child elements which can describe the position of a field.
+_FIELD_BIT_TAGS = ("bitOffset", "bitWidth", "bitRange", "lsb", "msb")
+
+
+def iterparse_peripherals(svd_file):
+    """
+    Return an iterparse context over svd_file (a path or a binary file-like
+    object) which stops at the end of every `peripheral`.
+    """
+    return ET.iterparse(svd_file, events=("end",), tag="peripheral", **PARSE_OPTIONS)
+
+
+def iter_peripherals(context):
+    """
+    Yield each fully parsed peripheral of an iterparse_peripherals() context.
+
+    Once the caller is done with a peripheral it is cleared and detached, so
+    peak memory stays around the size of a single peripheral rather than the
+    whole device tree. Elements outside `peripherals`, such as the device
+    name, remain available through context.root.
+    """
+    for _, ptag in context:
+        yield ptag
+        ptag.clear()
+        parent = ptag.getparent()
+        while ptag.getprevious() is not None:
+            del parent[0]
+
+
+def get_field_offset_width(ftag):
+    """
+    Return the offset and width of a field, parsing either bitOffset+bitWidth,
+    or a bitRange tag, or lsb and msb tags.
+    """
+    # Collect the relevant children in one pass; the first of each wins,
+    # as it would with findtext().
+    bits = {}
+    for child in ftag:
+        if child.tag in _FIELD_BIT_TAGS:
+            bits.setdefault(child.tag, child.text or "")
+    if "bitOffset" in bits:
+        offset = int(bits["bitOffset"], 0)
+        width = int(bits.get("bitWidth"), 0)
+    elif "bitRange" in bits:
+        msb, lsb = bits["bitRange"][1:-1].split(":")
+        offset = int(lsb, 0)
+        width = int(msb, 0) - offset + 1
+    elif "lsb" in bits:
+        lsb = int(bits["lsb"], 0)
+        msb = int(bits.get("msb"), 0)
+        offset = lsb
+        width = msb - lsb + 1
+    return offset, width
@@ -0,0 +1,2 @@
+# Generated from svdtools/VERSION by `make version`; do not edit.
+__version__ = "0.1.27"
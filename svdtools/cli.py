@@ -1,56 +1,79 @@
-import click
+import sys
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 import svdtools
 
+if TYPE_CHECKING:
+    import click
 
-@click.group()
-@click.version_option(svdtools.__version__, prog_name="svdtools")
-def svdtools_cli():
-    pass
 
+def main() -> None:
+    """
+    Entry point of the `svd` command.
 
-@click.command()
-@click.argument("yaml-file")
-def patch(yaml_file):
-    """Patches an SVD file as specified by a YAML file"""
-    svdtools.patch.main(yaml_file)
+    Version queries are answered straight away; click is only imported
+    (and the command group only built) when a real subcommand runs.
+    """
+    args = sys.argv[1:]
+    if args == ["version"]:
+        print(svdtools.__version__)
+    elif args == ["--version"]:
+        print(f"svdtools, version {svdtools.__version__}")
+    else:
+        make_click_cli()()
 
 
-@click.command()
-@click.argument("yaml-file")
-@click.argument("deps-file")
-def makedeps(yaml_file, deps_file):
-    """Generate Make dependency file listing dependencies for a YAML file."""
-    svdtools.makedeps.main(yaml_file, deps_file)
+def __getattr__(name: str) -> "click.Group":
+    # The click group stays importable as `svdtools_cli`, built on first use.
+    if name == "svdtools_cli":
+        return make_click_cli()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-@click.command()
-@click.argument("svd-file")
-@click.option(
-    "--gaps/--no-gaps",
-    default=True,
-    help="Whether to print gaps in interrupt number sequence",
-)
-def interrupts(svd_file, gaps):
-    """Print list of all interrupts described by an SVD file."""
-    print(svdtools.interrupts.main(svd_file, gaps))
+@lru_cache(maxsize=None)
+def make_click_cli() -> "click.Group":
+    import click
 
+    @click.group()
+    @click.version_option(svdtools.__version__, prog_name="svdtools")
+    def svdtools_cli() -> None:
+        pass
 
-@click.command()
-@click.argument("svd-file")
-def mmap(svd_file):
-    """Generate text-based memory map of an SVD file."""
-    print(svdtools.mmap.main(svd_file))
+    @svdtools_cli.command()
+    @click.argument("yaml-file")
+    def patch(yaml_file: str) -> None:
+        """Patches an SVD file as specified by a YAML file"""
+        svdtools.patch.main(yaml_file)
 
+    @svdtools_cli.command()
+    @click.argument("yaml-file")
+    @click.argument("deps-file")
+    def makedeps(yaml_file: str, deps_file: str) -> None:
+        """Generate Make dependency file listing dependencies for a YAML file."""
+        svdtools.makedeps.main(yaml_file, deps_file)
 
-@click.command()
-def version():
-    """Version of svdtools library and tool."""
-    print(svdtools.__version__)
+    @svdtools_cli.command()
+    @click.argument("svd-file")
+    @click.option(
+        "--gaps/--no-gaps",
+        default=True,
+        help="Whether to print gaps in interrupt number sequence",
+    )
+    def interrupts(svd_file: str, gaps: bool) -> None:
+        """Print list of all interrupts described by an SVD file."""
+        for line in svdtools.interrupts.iter_lines(svd_file, gaps):
+            click.echo(line)
 
+    @svdtools_cli.command()
+    @click.argument("svd-file")
+    def mmap(svd_file: str) -> None:
+        """Generate text-based memory map of an SVD file."""
+        svdtools.mmap.write_lines(svd_file)
 
-svdtools_cli.add_command(patch)
-svdtools_cli.add_command(makedeps)
-svdtools_cli.add_command(interrupts)
-svdtools_cli.add_command(mmap)
-svdtools_cli.add_command(version)
+    @svdtools_cli.command()
+    def version() -> None:
+        """Version of svdtools library and tool."""
+        print(svdtools.__version__)
+
+    return svdtools_cli
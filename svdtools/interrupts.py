@@ -4,35 +4,85 @@ Copyright 2018-2020 Adam Greig
 Licensed under the MIT and Apache 2.0 licenses. See LICENSE files for details.
 """
 
+import sys
+from operator import itemgetter
+from typing import Dict, Iterator, List, Tuple
+
 import lxml.etree as ET
 
+from ._svd import iter_peripherals, iterparse_peripherals
+
+# Compiled once so the per-interrupt lookups run entirely inside libxml2.
+# string() yields "" for a missing child, and plain str results avoid
+# keeping a reference back to the (soon to be cleared) element.
+_NAME = ET.XPath("string(name)", smart_strings=False)
+_VALUE = ET.XPath("string(value)", smart_strings=False)
+_DESCRIPTION = ET.XPath("string(description)", smart_strings=False)
+
+
+def _collect_interrupts(svd_file: str) -> Tuple[str, List[Tuple[int, str, str, str]]]:
+    """
+    Stream through svd_file one peripheral at a time, collecting interrupts.
+
+    Each peripheral is cleared once its interrupts have been read, so peak
+    memory stays around the size of a single peripheral rather than the
+    whole device tree.
 
-def parse_device(svd_file):
-    interrupts = {}
-    tree = ET.parse(svd_file)
-    dname = tree.find("name").text
-    for ptag in tree.iter("peripheral"):
-        pname = ptag.find("name").text
-        for itag in ptag.iter("interrupt"):
-            name = itag.find("name").text
-            value = itag.find("value").text
-            maybe_desc = itag.find("description")
-            desc = maybe_desc.text.replace("\n", " ") if maybe_desc is not None else ""
-            interrupts[int(value)] = {"name": name, "desc": desc, "pname": pname}
+    Returns the device name and a list of (value, name, description,
+    peripheral name) tuples in document order.
+    """
+    interrupts = []
+    append = interrupts.append
+    context = iterparse_peripherals(svd_file)
+    for ptag in iter_peripherals(context):
+        # Every interrupt of a peripheral shares one interned name string.
+        pname = sys.intern(_NAME(ptag))
+        for itag in ptag.iterfind("interrupt"):
+            name = sys.intern(_NAME(itag))
+            value = _VALUE(itag)
+            desc = _DESCRIPTION(itag).replace("\n", " ")
+            append((int(value), name, desc, pname))
+    # Only peripherals are discarded, so the device name is still available.
+    dname = context.root.findtext("name")
     return dname, interrupts
 
 
-def main(svd_file, gaps=True):
-    name, interrupts = parse_device(svd_file)
-    missing = set()
+def parse_device(svd_file: str) -> Tuple[str, Dict[int, Dict[str, str]]]:
+    """
+    Returns the device name and a dict mapping each interrupt number to the
+    name, description and peripheral name of its last definition.
+    """
+    dname, interrupts = _collect_interrupts(svd_file)
+    return dname, {
+        val: {"name": name, "desc": desc, "pname": pname}
+        for val, name, desc, pname in interrupts
+    }
+
+
+def iter_lines(svd_file: str, gaps: bool = True) -> Iterator[str]:
+    """
+    Yield the formatted interrupt listing for svd_file one line at a time.
+    """
+    name, interrupts = _collect_interrupts(svd_file)
+    # Stable sort, so repeated interrupt numbers stay in document order.
+    interrupts.sort(key=itemgetter(0))
+    missing = []
     lastint = -1
-    results = []
-    for val in sorted(interrupts.keys()):
-        for v in range(lastint + 1, val):
-            missing.add(v)
-        lastint = val
-        i = interrupts[val]
-        results.append(f"{val} {i['name']}: {i['desc']} (in {i['pname']})")
+    line = None
+    for val, iname, desc, pname in interrupts:
+        if val != lastint:
+            if line is not None:
+                yield line
+            if val > lastint + 1:
+                missing.append(range(lastint + 1, val))
+            lastint = val
+        # The last definition of a repeated interrupt number wins.
+        line = f"{val} {iname}: {desc} (in {pname})"
+    if line is not None:
+        yield line
     if gaps:
-        results.append("Gaps: " + ", ".join(str(x) for x in sorted(missing)))
-    return "\n".join(results)
+        yield "Gaps: " + ", ".join(str(x) for gap in missing for x in gap)
+
+
+def main(svd_file: str, gaps: bool = True) -> str:
+    return "\n".join(iter_lines(svd_file, gaps))
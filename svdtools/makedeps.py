@@ -4,15 +4,57 @@ Copyright 2017, 2020 Adam Greig
 Licensed under the MIT and Apache 2.0 licenses. See LICENSE files for details.
 """
 
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Union
+
 import yaml
 
 from . import patch
 
 
-def main(yaml_file, deps_file):
-    with open(yaml_file, encoding="utf-8") as f:
-        device = yaml.safe_load(f)
-    device["_path"] = yaml_file
-    deps = patch.yaml_includes(device)
-    with open(deps_file, "w") as f:
-        f.write("{}: {}\n".format(deps_file, " ".join(deps)))
+def get_mtimes(paths: Iterable[str]) -> Dict[str, int]:
+    return {path: os.stat(path).st_mtime_ns for path in paths}
+
+
+def load_cached_deps(yaml_file: str, cache_file: str) -> Optional[List[str]]:
+    """
+    Return the dependencies of yaml_file recorded in cache_file, or None if
+    there is no usable cache or any of the recorded files has changed.
+    """
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache["yaml_file"] != yaml_file:
+            return None
+        if get_mtimes(cache["mtimes"]) != cache["mtimes"]:
+            return None
+        return cache["deps"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_cached_deps(yaml_file: str, deps: List[str], cache_file: str) -> None:
+    cache = {
+        "yaml_file": yaml_file,
+        "deps": deps,
+        "mtimes": get_mtimes([yaml_file] + deps),
+    }
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+
+def main(yaml_file: Union[str, "os.PathLike[str]"], deps_file: str) -> None:
+    # Reuse the previous run's result when neither the root file nor any
+    # of its includes has been modified since, which only costs a stat each.
+    yaml_file = os.fspath(yaml_file)
+    cache_file = f"{deps_file}.cache"
+    deps = load_cached_deps(yaml_file, cache_file)
+    if deps is None:
+        with open(yaml_file, "rb") as f:
+            device = yaml.load(f, Loader=patch.YamlLoader)
+        device["_path"] = yaml_file
+        deps = patch.yaml_includes(device)
+        save_cached_deps(yaml_file, deps, cache_file)
+    with open(deps_file, "wb") as f:
+        f.write("{}: {}\n".format(deps_file, " ".join(deps)).encode("utf-8"))
@@ -6,52 +6,34 @@ Licensed under the MIT and Apache 2.0 licenses. See LICENSE files for details.
 """
 
 import copy
+import io
+import sys
+from functools import lru_cache
 
 import lxml.etree as ET
 
+from . import _svd
 
-def get_field_offset_width(ftag):
-    """
-    Return the offset and width of a field, parsing either bitOffset+bitWidth,
-    or a bitRange tag, or lsb and msb tags.
-    """
-    if ftag.findtext("bitOffset") is not None:
-        offset = int(ftag.findtext("bitOffset"), 0)
-        width = int(ftag.findtext("bitWidth"), 0)
-    elif ftag.findtext("bitRange") is not None:
-        msb, lsb = ftag.findtext("bitRange")[1:-1].split(":")
-        offset = int(lsb, 0)
-        width = int(msb, 0) - offset + 1
-    elif ftag.findtext("lsb") is not None:
-        lsb = int(ftag.findtext("lsb"), 0)
-        msb = int(ftag.findtext("msb"), 0)
-        offset = lsb
-        fwidth = msb - lsb + 1
-    return offset, width
+# Child lists are looked up through XPaths compiled once at import, rather
+# than re-parsing a path string for every node. Only the first <registers>
+# or <fields> is considered, as with find().
+_CLUSTERS = ET.XPath("registers[1]/cluster")
+_REGISTERS = ET.XPath("registers[1]/register")
+_FIELDS = ET.XPath("fields[1]/field")
+_CLUSTER_REGISTERS = ET.XPath("register")
+_INTERRUPTS = ET.XPath("interrupt")
 
 
 def iter_clusters(ptag):
-    registers = ptag.find("registers")
-    if registers is None:
-        return []
-    else:
-        return registers.findall("cluster")
+    return _CLUSTERS(ptag)
 
 
 def iter_registers(ptag):
-    registers = ptag.find("registers")
-    if registers is None:
-        return []
-    else:
-        return registers.findall("register")
+    return _REGISTERS(ptag)
 
 
 def iter_fields(rtag):
-    fields = rtag.find("fields")
-    if fields is None:
-        return []
-    else:
-        return fields.findall("field")
+    return _FIELDS(rtag)
 
 
 ACCESS = {"read-only": "ro", "read-write": "rw", "write-only": "wo"}
@@ -81,6 +63,17 @@ def get_int(node, tag, default=None):
     text = get_string(node, tag, default=default)
     if text == default:
         return text
+    return parse_int(text)
+
+
+@lru_cache(maxsize=4096)
+def parse_int(text):
+    """
+    Convert an SVD scalar (decimal, 0x/0b prefixed, or a boolean) to an int.
+
+    SVDs repeat the same handful of offsets and sizes many times over, so
+    conversions are cached.
+    """
     text = text.lower().strip()
     if text == "true":
         return 1
@@ -155,7 +148,7 @@ def expand_cluster(node):
     cluster_idx = node.attrib["dim_index"]
     cluster_addr = get_int(node, "addressOffset")
     nodes = []
-    for rtag in node.findall("register"):
+    for rtag in _CLUSTER_REGISTERS(node):
         addr = cluster_addr + get_int(rtag, "addressOffset")
         name = get_string(rtag, "name") + str(cluster_idx)
         new_rtag = copy.deepcopy(rtag)
@@ -170,15 +163,16 @@ def parse_register(rtag):
     Extract register and field information from a register node into a dict.
     """
     fields = {}
-    rname = get_string(rtag, "name")
+    # Register and field names repeat across peripherals, so share them.
+    rname = sys.intern(get_string(rtag, "name"))
     rdesc = get_string(rtag, "description")
     raccess = get_access(rtag)
     roffset = get_int(rtag, "addressOffset")
     r_derived = derived_str(rtag.attrib.get("derivedFrom", None))
     for ftag in iter_fields(rtag):
         for ftag in expand_dim(ftag, field=True):
-            fname = get_string(ftag, "name")
-            foffset, fwidth = get_field_offset_width(ftag)
+            fname = sys.intern(get_string(ftag, "name"))
+            foffset, fwidth = _svd.get_field_offset_width(ftag)
             fdesc = get_string(ftag, "description")
             faccess = get_access(ftag)
             f_derived = derived_str(ftag.attrib.get("derivedFrom", None))
@@ -200,74 +194,97 @@ def parse_register(rtag):
     }
 
 
+def parse_peripheral(ptag, device_interrupts):
+    """
+    Extract interrupt, cluster, register and field information from a
+    peripheral node into a dict. Its interrupts are also recorded in
+    device_interrupts, keyed by value.
+    """
+    interrupts = {}
+    registers = {}
+    clusters = {}
+    pname = get_string(ptag, "name")
+    pbase = get_int(ptag, "baseAddress")
+    for itag in _INTERRUPTS(ptag):
+        iname = get_string(itag, "name")
+        idesc = get_string(itag, "description")
+        ival = get_int(itag, "value")
+        interrupt = {
+            "name": iname,
+            "description": idesc,
+            "value": ival,
+            "pname": pname,
+        }
+        interrupts[iname] = device_interrupts[ival] = interrupt
+    for ctag in iter_clusters(ptag):
+        for ctag in expand_dim(ctag):
+            cname = get_string(ctag, "name")
+            cdesc = get_string(ctag, "description")
+            coff = get_int(ctag, "addressOffset")
+            c_derived = derived_str(ctag.attrib.get("derivedFrom", None))
+            for rtag in expand_cluster(ctag):
+                register = parse_register(rtag)
+                registers[register["name"]] = register
+            clusters[cname] = {
+                "name": cname,
+                "description": cdesc,
+                "offset": coff,
+                "derived": c_derived,
+            }
+    for rtag in iter_registers(ptag):
+        for rtag in expand_dim(rtag):
+            register = parse_register(rtag)
+            registers[register["name"]] = register
+    peripheral = {
+        "name": pname,
+        "base": pbase,
+        "interrupts": interrupts,
+        "registers": registers,
+        "clusters": clusters,
+    }
+    if "derivedFrom" in ptag.attrib:
+        peripheral["derives"] = ptag.attrib["derivedFrom"]
+    return peripheral
+
+
 def parse(svdfile):
     """
     Parse SVD file into dict of peripherals, registers, and fields.
+
+    svdfile may be a path or a binary file-like object. The file is
+    streamed one peripheral at a time, and each peripheral is discarded once
+    it has been read, so the whole device tree is never held in memory.
     """
-    tree = ET.parse(svdfile)
     peripherals = {}
     device_interrupts = {}
-    for ptag in tree.find("peripherals").findall("peripheral"):
-        interrupts = {}
-        registers = {}
-        clusters = {}
-        pname = get_string(ptag, "name")
-        pbase = get_int(ptag, "baseAddress")
-        for itag in ptag.findall("interrupt"):
-            iname = get_string(itag, "name")
-            idesc = get_string(itag, "description")
-            ival = get_int(itag, "value")
-            interrupt = {
-                "name": iname,
-                "description": idesc,
-                "value": ival,
-                "pname": pname,
-            }
-            interrupts[iname] = device_interrupts[ival] = interrupt
-        for ctag in iter_clusters(ptag):
-            for ctag in expand_dim(ctag):
-                cname = get_string(ctag, "name")
-                cdesc = get_string(ctag, "description")
-                coff = get_int(ctag, "addressOffset")
-                c_derived = derived_str(ctag.attrib.get("derivedFrom", None))
-                for rtag in expand_cluster(ctag):
-                    register = parse_register(rtag)
-                    registers[register["name"]] = register
-                clusters[cname] = {
-                    "name": cname,
-                    "description": cdesc,
-                    "offset": coff,
-                    "derived": c_derived,
-                }
-        for rtag in iter_registers(ptag):
-            for rtag in expand_dim(rtag):
-                register = parse_register(rtag)
-                registers[register["name"]] = register
-        peripherals[pname] = {
-            "name": pname,
-            "base": pbase,
-            "interrupts": interrupts,
-            "registers": registers,
-            "clusters": clusters,
-        }
-        if "derivedFrom" in ptag.attrib:
-            peripherals[pname]["derives"] = ptag.attrib["derivedFrom"]
+    for ptag in _svd.iter_peripherals(_svd.iterparse_peripherals(svdfile)):
+        peripheral = parse_peripheral(ptag, device_interrupts)
+        peripherals[peripheral["name"]] = peripheral
     for pname, periph in list(peripherals.items()):
         if "derives" in periph:
             peripherals[pname]["registers"] = peripherals[periph["derives"]][
                 "registers"
             ]
+    # Only a path gives the device a name; file-like sources have none.
+    name = svdfile.split(".")[0] if isinstance(svdfile, str) else None
     return {
-        "name": svdfile.split(".")[0],
+        "name": name,
         "peripherals": peripherals,
         "interrupts": device_interrupts,
     }
 
 
-def to_text(device):
+# Rendered "offsetwwidth" specs for every field that fits in 32 bits; anything
+# wider (64-bit registers, malformed SVDs) is formatted on the fly.
+_BITSPECS = tuple(
+    tuple(f"{offset:02d}w{width:02d}" for width in range(33)) for offset in range(32)
+)
+
+
+def to_lines(device):
     """
-    Output sorted text of every peripheral, register, field, and interrupt
-    in the device, such that automated diffing is possible.
+    Return the sorted lines of text for every peripheral, register, field,
+    and interrupt in the device, such that automated diffing is possible.
     """
     mmap = []
     for i in device["interrupts"].values():
@@ -284,21 +301,67 @@ def to_text(device):
                 + f"{c['description']}"
             )
         for r in p["registers"].values():
-            addr = p["base"] + r["offset"]
+            # Every field line of a register starts with the same address.
+            addr = f"0x{p['base'] + r['offset']:08X}"
             mmap.append(
-                f"0x{addr:08X} B  REGISTER {r['name']}{r['derived']}{r['access']}: "
+                f"{addr} B  REGISTER {r['name']}{r['derived']}{r['access']}: "
                 + f"{r['description']}"
             )
             for f in r["fields"].values():
                 offset, width = f["offset"], f["width"]
+                if 0 <= offset < 32 and 0 <= width <= 32:
+                    bitspec = _BITSPECS[offset][width]
+                else:
+                    bitspec = f"{offset:02d}w{width:02d}"
                 mmap.append(
-                    f"0x{addr:08X} C   FIELD {offset:02d}w{width:02d} "
+                    f"{addr} C   FIELD {bitspec} "
                     + f"{f['name']}{f['derived']}{f['access']}: "
                     + f"{f['description']}"
                 )
-    return "\n".join(sorted(mmap))
+    mmap.sort()
+    return mmap
+
+
+def to_text(device):
+    """
+    Output sorted text of every peripheral, register, field, and interrupt
+    in the device, such that automated diffing is possible.
+    """
+    return "\n".join(to_lines(device))
+
+
+def write_lines(svd_file, out=None, bufsize=65536):
+    """
+    Write the memory map of svd_file to the binary stream out (standard
+    output by default) as UTF-8, one line per row.
+
+    Lines are gathered into chunks of about bufsize bytes, so a large map
+    takes a handful of writes rather than one per line.
+    """
+    if out is None:
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+    buf = bytearray()
+    for line in to_lines(parse(svd_file)):
+        buf += line.encode("utf-8")
+        buf += b"\n"
+        if len(buf) >= bufsize:
+            out.write(buf)
+            buf.clear()
+    out.write(buf)
+    out.flush()
 
 
 def main(svd_file):
-    device = parse(svd_file)
-    return to_text(device)
+    """
+    Return the memory map of svd_file, which may be a path or a binary
+    file-like object.
+    """
+    return to_text(parse(svd_file))
+
+
+def mmap_from_bytes(data):
+    """
+    Return the memory map of an SVD already held in memory as bytes.
+    """
+    return main(io.BytesIO(data))
@@ -10,7 +10,8 @@ import fnmatch
 import os.path
 import re
 from collections import OrderedDict
-from fnmatch import fnmatchcase
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from typing import Any, Generator, Union
 
@@ -20,6 +21,14 @@ from braceexpand import braceexpand
 from lxml.etree import _Element as Element
 from lxml.etree import _ElementTree as ElementTree
 
+from ._svd import get_field_offset_width
+
+# Parse YAML with libyaml's C implementation when PyYAML was built with it.
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 DEVICE_CHILDREN = [
     "vendor",
     "vendorID",
@@ -39,6 +48,13 @@ DEVICE_CHILDREN = [
     "resetMask",
 ]
 
+# The enumeratedValues of a register's fields named $name. Passing the name
+# as a variable also keeps quotes inside it from breaking the expression.
+XPATH_ENUMERATED_VALUES = ET.XPath("fields/field/enumeratedValues[name=$name]")
+
+# Characters which make a specification more than a literal name.
+SPEC_MAGIC = re.compile(r"[*?\[{,]")
+
 
 # Set up pyyaml to use ordered dicts so we generate the same
 # XML output each time, and detect and refuse duplicate keys.
@@ -54,6 +70,7 @@ def dict_constructor(loader, node, deep=False):
 
 _mapping_tag = yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG
 yaml.add_constructor(_mapping_tag, dict_constructor, yaml.SafeLoader)
+yaml.add_constructor(_mapping_tag, dict_constructor, YamlLoader)
 
 
 def get_spec(spec):
@@ -63,35 +80,65 @@ def get_spec(spec):
         return spec, False
 
 
+@lru_cache(maxsize=None)
+def is_literal_spec(spec):
+    """Check if a specification is a plain name, without any glob syntax."""
+    return SPEC_MAGIC.search(spec) is None
+
+
+@lru_cache(maxsize=None)
+def expand_spec(spec):
+    """Return the tuple of sub-specifications contained in a specification."""
+    if "{" in spec:
+        return tuple(braceexpand(spec))
+    else:
+        return tuple(spec.split(","))
+
+
+@lru_cache(maxsize=8192)
+def compile_subspec(subspec):
+    """Compile a single glob sub-specification to a regex matching whole names."""
+    return re.compile(fnmatch.translate(subspec))
+
+
+@lru_cache(maxsize=8192)
+def compile_spec(spec):
+    """
+    Compile all sub-specifications of a specification into one alternation,
+    so a name is tested against the whole spec with a single regex match.
+    """
+    subspecs = expand_spec(spec)
+    return re.compile("|".join(f"(?:{fnmatch.translate(s)})" for s in subspecs))
+
+
+@lru_cache(maxsize=65536)
 def matchname(name, spec):
     """Check if name matches against a specification."""
     if spec.startswith("_"):
         return False
+    if is_literal_spec(spec):
+        return name == spec
     if spec.startswith("?~"):
         raise SvdPatchError(f"{spec}: optional rules are not supported here yet")
-    if "{" in spec:
-        return any(fnmatchcase(name, subspec) for subspec in braceexpand(spec))
-    else:
-        return any(fnmatchcase(name, subspec) for subspec in spec.split(","))
+    return compile_spec(spec).match(name) is not None
 
 
+@lru_cache(maxsize=65536)
 def matchsubspec(name, spec):
     """If a name matches a specification, return the first sub-specification that it
     matches.
     """
     if not matchname(name, spec):
         return None
-    if "{" in spec:
-        for subspec in braceexpand(spec):
-            if fnmatchcase(name, subspec):
-                return subspec
-    else:
-        for subspec in spec.split(","):
-            if fnmatchcase(name, subspec):
-                return subspec
+    if is_literal_spec(spec):
+        return spec
+    for subspec in expand_spec(spec):
+        if compile_subspec(subspec).match(name):
+            return subspec
     return None
 
 
+@lru_cache(maxsize=1024)
 def create_regex_from_pattern(substr, strip_end):
     """Create regex from pattern to match start or end of string."""
     regex = fnmatch.translate(substr)
@@ -113,16 +160,42 @@ def update_dict(parent, child):
     """
     Recursively merge child.key into parent.key, with parent overriding.
     """
-    for key in child:
-        if key == "_path" or key == "_include":
-            continue
-        elif key in parent:
-            if isinstance(parent[key], list):
-                parent[key] += child[key]
-            elif isinstance(parent[key], dict):
-                update_dict(parent[key], child[key])
+    # Nested dicts are merged depth-first using an explicit stack of
+    # partially consumed children, in the same order as a recursive merge.
+    stack = [(parent, child, iter(child))]
+    while stack:
+        parent, child, keys = stack[-1]
+        for key in keys:
+            if key == "_path" or key == "_include":
+                continue
+            elif key in parent:
+                if isinstance(parent[key], list):
+                    parent[key] += child[key]
+                elif isinstance(parent[key], dict):
+                    stack.append((parent[key], child[key], iter(child[key])))
+                    break
+            else:
+                parent[key] = child[key]
         else:
-            parent[key] = child[key]
+            stack.pop()
+
+
+@lru_cache(maxsize=256)
+def parse_yaml_file(path, mtime):
+    """
+    Parse a YAML file. mtime is only part of the cache key, so that a file
+    which has since been modified is parsed again.
+    """
+    with open(path, encoding="utf-8") as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+def load_yaml_file(path):
+    """
+    Load a YAML file, reusing an earlier parse while the file is unchanged.
+    Returns a copy which the caller is free to modify.
+    """
+    return copy.deepcopy(parse_yaml_file(path, os.stat(path).st_mtime_ns))
 
 
 def yaml_includes(parent):
@@ -137,8 +210,7 @@ def yaml_includes(parent):
         path = abspath(parent["_path"], relpath)
         if path in included:
             continue
-        with open(path, encoding="utf-8") as f:
-            child = yaml.safe_load(f)
+        child = load_yaml_file(path)
         child["_path"] = path
         included.append(path)
         # Process any top-level includes in child
@@ -168,10 +240,9 @@ def make_enumerated_values(name, values, usage="read-write"):
     usagekey = {"read": "R", "write": "W"}.get(usage, "")
     ET.SubElement(ev, "name").text = name + usagekey
     ET.SubElement(ev, "usage").text = usage
-    if len(set(v[0] for v in values.values())) != len(values):
-        raise ValueError(f"enumeratedValue {name}: can't have duplicate values")
     if name[0] in "0123456789":
         raise ValueError(f"enumeratedValue {name}: can't start with a number")
+    seen = set()
     for vname in values:
         if vname.startswith("_"):
             continue
@@ -180,6 +251,9 @@ def make_enumerated_values(name, values, usage="read-write"):
                 f"enumeratedValue {name}.{vname}: can't start with a number"
             )
         value, description = values[vname]
+        if value in seen:
+            raise ValueError(f"enumeratedValue {name}: can't have duplicate values")
+        seen.add(value)
         if not description:
             raise ValueError(
                 f"enumeratedValue {name}: can't have empty description for value {value}"
@@ -202,6 +276,7 @@ def make_derived_enumerated_values(name):
     return evd
 
 
+@lru_cache(maxsize=1024)
 def spec_ind(spec):
     """
     Find left and right indices of enumeration token in specification string.
@@ -209,49 +284,150 @@ def spec_ind(spec):
     comma = spec.find(",")
     if comma > -1:
         spec = spec[:comma]
-    li1 = spec.find("*")
-    li2 = spec.find("?")
-    li3 = spec.find("[")
-    li = li1 if li1 > -1 else li2 if li2 > -1 else li3 if li3 > -1 else None
-    ri1 = spec[::-1].find("*")
-    ri2 = spec[::-1].find("?")
-    ri3 = spec[::-1].find("]")
-    ri = ri1 if ri1 > -1 else ri2 if ri2 > -1 else ri3 if ri3 > -1 else None
+    # A "*" takes precedence over a "?", which takes precedence over a
+    # character class, wherever each of them appears in the spec.
+    # The right index is counted from the end of the spec.
+    li = ri = None
+    for token in "*?[":
+        index = spec.find(token)
+        if index > -1:
+            li = index
+            break
+    for token in "*?]":
+        index = spec.rfind(token)
+        if index > -1:
+            ri = len(spec) - 1 - index
+            break
     return li, ri
 
 
 def check_offsets(offsets, dimIncrement):
-    for o1, o2 in zip(offsets[:-1], offsets[1:]):
-        if o2 - o1 != dimIncrement:
-            return False
-    return True
+    # Compare against the expected evenly spaced sequence in one go;
+    # range() cannot express the zero step of a single element array.
+    if not offsets or dimIncrement == 0:
+        return all(o == offsets[0] for o in offsets)
+    stop = offsets[0] + dimIncrement * len(offsets)
+    return offsets == list(range(offsets[0], stop, dimIncrement))
 
 
 def check_bitmasks(masks, mask):
-    for m in masks:
-        if m != mask:
-            return False
-    return True
-
-
-def get_field_offset_width(ftag):
-    """
-    Return the offset and width of a field, parsing either bitOffset+bitWidth,
-    or a bitRange tag, or lsb and msb tags.
-    """
-    if ftag.findtext("bitOffset") is not None:
-        offset = int(ftag.findtext("bitOffset"), 0)
-        width = int(ftag.findtext("bitWidth"), 0)
-    elif ftag.findtext("bitRange") is not None:
-        msb, lsb = ftag.findtext("bitRange")[1:-1].split(":")
-        offset = int(lsb, 0)
-        width = int(msb, 0) - offset + 1
-    elif ftag.findtext("lsb") is not None:
-        lsb = int(ftag.findtext("lsb"), 0)
-        msb = int(ftag.findtext("msb"), 0)
-        offset = lsb
-        fwidth = msb - lsb + 1
-    return offset, width
+    return masks.count(mask) == len(masks)
+
+
+# Child elements of each SVD element, in the order the schema requires them.
+DIM_ELEMENT_GROUP = ("dim", "dimIncrement", "dimIndex", "dimName", "dimArrayIndex")
+REGISTER_PROPERTIES_GROUP = ("size", "access", "protection", "resetValue", "resetMask")
+ELEMENT_ORDERS = {
+    "enumeratedValue": ("name", "description", "value", "isDefault"),
+    "enumeratedValues": ("name", "headerEnumName", "usage", "enumeratedValue"),
+    "field": DIM_ELEMENT_GROUP
+    + (
+        "name",
+        "description",
+        "bitOffset",
+        "bitWidth",
+        "lsb",
+        "msb",
+        "bitRange",
+        "access",
+        "modifiedWriteValues",
+        "writeConstraint",
+        "readAction",
+        "enumeratedValues",
+    ),
+    "fields": ("field",),
+    "writeConstraint": ("writeAsRead", "useEnumeratedValues", "range"),
+    "range": ("minimum", "maximum"),
+    "register": DIM_ELEMENT_GROUP
+    + (
+        "name",
+        "displayName",
+        "description",
+        "alternateGroup",
+        "alternateRegister",
+        "addressOffset",
+    )
+    + REGISTER_PROPERTIES_GROUP
+    + (
+        "dataType",
+        "modifiedWriteValues",
+        "writeConstraint",
+        "readAction",
+        "fields",
+    ),
+    "cluster": DIM_ELEMENT_GROUP
+    + (
+        "name",
+        "description",
+        "alternateCluster",
+        "headerStructName",
+        "addressOffset",
+    )
+    + REGISTER_PROPERTIES_GROUP
+    + ("register", "cluster"),
+    "registers": ("cluster", "register"),
+    "interrupt": ("name", "description", "value"),
+    "addressBlock": ("offset", "size", "usage", "protection"),
+    "peripheral": DIM_ELEMENT_GROUP
+    + (
+        "name",
+        "version",
+        "description",
+        "alternatePeripheral",
+        "groupName",
+        "prependToName",
+        "appendToName",
+        "headerStructName",
+        "disableCondition",
+        "baseAddress",
+    )
+    + REGISTER_PROPERTIES_GROUP
+    + ("addressBlock", "interrupt", "registers"),
+    "peripherals": ("peripheral",),
+    "cpu": (
+        "name",
+        "revision",
+        "endian",
+        "mpuPresent",
+        "fpuPresent",
+        "fpuDP",
+        "dspPresent",
+        "icachePresent",
+        "dcachePresent",
+        "itcmPresent",
+        "dtcmPresent",
+        "vtorPresent",
+        "nvicPrioBits",
+        "vendorSystickConfig",
+        "deviceNumInterrupts",
+        "sauNumRegions",
+        "sauRegionsConfig",
+    ),
+    "sauRegionsConfig": ("region",),
+    "region": ("base", "limit", "access"),
+    "device": (
+        "vendor",
+        "vendorID",
+        "name",
+        "series",
+        "version",
+        "description",
+        "licenseText",
+        "cpu",
+        "headerSystemFilename",
+        "headerDefinitionsPrefix",
+        "addressUnitBits",
+        "width",
+    )
+    + REGISTER_PROPERTIES_GROUP
+    + ("peripherals", "vendorExtensions"),
+}
+
+# Position of each permitted child element, keyed by parent element.
+ELEMENT_RANKS = {
+    parent: {child: rank for rank, child in enumerate(order)}
+    for parent, order in ELEMENT_ORDERS.items()
+}
 
 
 def sort_element(tag):
@@ -261,128 +437,28 @@ def sort_element(tag):
     However, new elements may have been been specified in any order,
     so we sort all elements after processing a file.
     """
-    arr = ("dim", "dimIncrement", "dimIndex", "dimName", "dimArrayIndex")
-    acc = ("size", "access", "protection", "resetValue", "resetMask")
-    orders = {
-        "enumeratedValue": ("name", "description", "value", "isDefault"),
-        "enumeratedValues": ("name", "headerEnumName", "usage", "enumeratedValue"),
-        "field": arr
-        + (
-            "name",
-            "description",
-            "bitOffset",
-            "bitWidth",
-            "lsb",
-            "msb",
-            "bitRange",
-            "access",
-            "modifiedWriteValues",
-            "writeConstraint",
-            "readAction",
-            "enumeratedValues",
-        ),
-        "fields": ("field"),
-        "writeConstraint": ("writeAsRead", "useEnumeratedValues", "range"),
-        "range": ("minimum", "maximum"),
-        "register": arr
-        + (
-            "name",
-            "displayName",
-            "description",
-            "alternateGroup",
-            "alternateRegister",
-            "addressOffset",
-        )
-        + acc
-        + (
-            "dataType",
-            "modifiedWriteValues",
-            "writeConstraint",
-            "readAction",
-            "fields",
-        ),
-        "cluster": arr
-        + (
-            "name",
-            "description",
-            "alternateCluster",
-            "headerStructName",
-            "addressOffset",
-        )
-        + acc
-        + ("register", "cluster"),
-        "registers": ("cluster", "register"),
-        "interrupt": ("name", "description", "value"),
-        "addressBlock": ("offset", "size", "usage", "protection"),
-        "peripheral": arr
-        + (
-            "name",
-            "version",
-            "description",
-            "alternatePeripheral",
-            "groupName",
-            "prependToName",
-            "appendToName",
-            "headerStructName",
-            "disableCondition",
-            "baseAddress",
-        )
-        + acc
-        + ("addressBlock", "interrupt", "registers"),
-        "peripherals": ("peripheral"),
-        "cpu": (
-            "name",
-            "revision",
-            "endian",
-            "mpuPresent",
-            "fpuPresent",
-            "fpuDP",
-            "dspPresent",
-            "icachePresent",
-            "dcachePresent",
-            "itcmPresent",
-            "dtcmPresent",
-            "vtorPresent",
-            "nvicPrioBits",
-            "vendorSystickConfig",
-            "deviceNumInterrupts",
-            "sauNumRegions",
-            "sauRegionsConfig",
-        ),
-        "sauRegionsConfig": ("region"),
-        "region": ("base", "limit", "access"),
-        "device": (
-            "vendor",
-            "vendorID",
-            "name",
-            "series",
-            "version",
-            "description",
-            "licenseText",
-            "cpu",
-            "headerSystemFilename",
-            "headerDefinitionsPrefix",
-            "addressUnitBits",
-            "width",
-        )
-        + acc
-        + ("peripherals", "vendorExtensions"),
-    }
-    if tag.tag == "vendorExtensions":
+    if tag.tag == "vendorExtensions" or len(tag) == 0:
         # We can't sort inside vendorExtensions.
         return
-    if len(tag) > 0 and tag.tag not in orders:
+    ranks = ELEMENT_RANKS.get(tag.tag)
+    if ranks is None:
         raise UnknownTagError(tag.tag)
     comments = []
+    order = []
     for child in tag:
         if child.tag is ET.Comment:
             comments.append(child)
-        elif child.tag not in orders[tag.tag]:
+        elif child.tag not in ranks:
             raise UnknownTagError((tag.tag, child.tag))
+        else:
+            order.append(ranks[child.tag])
     for comment in comments:
         # Remove interior comments, which we cannot sort.
         tag.remove(comment)
-    tag[:] = sorted(tag, key=lambda e: orders[tag.tag].index(e.tag))
+    # Most elements come straight from the original SVD and are already in
+    # order; relinking their children would only cost time.
+    if any(a > b for a, b in zip(order, order[1:])):
+        tag[:] = sorted(tag, key=lambda e: ranks[e.tag])
 
 
 def sort_recursive(tag):
@@ -436,11 +512,25 @@ class Device:
 
     def __init__(self, device):
         self.device = device
+        # Built on demand by peripheral_index(); reset to None by every method
+        # which adds, removes or renames peripherals.
+        self._peripherals = None
+
+    def peripheral_index(self):
+        """
+        Returns a dict mapping peripheral names to their `peripheral` tags.
+        Should a name be repeated, the first peripheral wins, as with find().
+        """
+        if self._peripherals is None:
+            self._peripherals = {}
+            for ptag in self.device.iterfind("peripherals/peripheral"):
+                self._peripherals.setdefault(ptag.findtext("name"), ptag)
+        return self._peripherals
 
     def iter_peripherals(self, pspec):
         """Iterates over all peripherals that match pspec."""
-        for ptag in self.device.iter("peripheral"):
-            name = ptag.find("name").text
+        for ptag in self.device.iterfind("peripherals/peripheral"):
+            name = ptag.findtext("name")
             if matchname(name, pspec):
                 yield ptag
 
@@ -477,6 +567,7 @@ class Device:
                     ):
                         derived.set("derivedFrom", value)
                     ptag.find("name").text = value
+                    self._peripherals = None
                     continue
 
                 # We do not change derivedFrom peripherals beyond this point.
@@ -505,9 +596,8 @@ class Device:
     def add_peripheral(self, pname, padd):
         """Add pname given by padd to device."""
         parent = self.device.find("peripherals")
-        for ptag in parent.iter("peripheral"):
-            if ptag.find("name").text == pname:
-                raise SvdPatchError(f"device already has a peripheral {pname}")
+        if pname in self.peripheral_index():
+            raise SvdPatchError(f"device already has a peripheral {pname}")
         if "derivedFrom" in padd:
             derived = padd["derivedFrom"]
             pnew = ET.SubElement(parent, "peripheral", {"derivedFrom": derived})
@@ -534,11 +624,13 @@ class Device:
             elif key != "derivedFrom":
                 ET.SubElement(pnew, key).text = str(value)
         pnew.tail = "\n    "
+        self._peripherals = None
 
     def delete_peripheral(self, pspec):
         """Delete registers matched by rspec inside ptag."""
         for ptag in list(self.iter_peripherals(pspec)):
             self.device.find("peripherals").remove(ptag)
+        self._peripherals = None
 
     def derive_peripheral(self, pname, pmod):
         """
@@ -556,8 +648,9 @@ class Device:
             description = pmod.get("description", None)
         else:
             raise SvdPatchError(f"derive: incorrect syntax for {pname}")
-        ptag = parent.find(f"./peripheral[name='{pname}']")
-        derived = parent.find(f"./peripheral[name='{pderive}']")
+        peripherals = self.peripheral_index()
+        ptag = peripherals.get(pname)
+        derived = peripherals.get(pderive)
         if (not ("." in pderive)) and (derived is None):
             raise SvdPatchError(f"peripheral {pderive} not found")
         if ptag is None:
@@ -573,9 +666,7 @@ class Device:
                 ptag.find("baseAddress").text = hex(base_address)
             if description:
                 ptag.find("description").text = description
-        for value in ptag:
-            last = value
-        last.tail = "\n    "
+        ptag[-1].tail = "\n    "
         ptag.set("derivedFrom", pderive)
         for p in parent.findall(f"./peripheral[@derivedFrom='{pname}']"):
             p.set("derivedFrom", pderive)
@@ -585,7 +676,7 @@ class Device:
         Create copy of peripheral
         """
         parent = self.device.find("peripherals")
-        ptag = parent.find(f"./peripheral[name='{pname}']")
+        ptag = self.peripheral_index().get(pname)
         pcopysrc = pmod["from"].split(":")
         pcopyname = pcopysrc[-1]
         if len(pcopysrc) == 2:
@@ -593,8 +684,9 @@ class Device:
             filedev = Device(ET.parse(pcopyfile))
             source = filedev.device.find("peripherals")
         else:
+            filedev = self
             source = parent
-        pcopy = copy.deepcopy(source.find(f"./peripheral[name='{pcopyname}']"))
+        pcopy = copy.deepcopy(filedev.peripheral_index().get(pcopyname))
         if pcopy is None:
             raise SvdPatchError(f"peripheral {pcopy} not found")
 
@@ -618,6 +710,7 @@ class Device:
 
         # Add our new copied peripheral to the device
         parent.append(pcopy)
+        self._peripherals = None
 
     def rebase_peripheral(self, pnew, pold):
         """
@@ -625,23 +718,20 @@ class Device:
         Update all derivedFrom referencing pold.
         """
         parent = self.device.find("peripherals")
-        old = parent.find(f"./peripheral[name='{pold}']")
-        new = parent.find(f"./peripheral[name='{pnew}']")
+        peripherals = self.peripheral_index()
+        old = peripherals.get(pold)
+        new = peripherals.get(pnew)
         if old is None:
             raise SvdPatchError(f"peripheral {pold} not found")
         if new is None:
             raise SvdPatchError(f"peripheral {pnew} not found")
-        for value in new:
-            last = value
-        last.tail = "\n      "
+        new[-1].tail = "\n      "
         for value in list(old):
             if value.tag in ("name", "baseAddress", "interrupt"):
                 continue
             old.remove(value)
             new.append(value)
-        for value in old:
-            last = value
-        last.tail = "\n    "
+        old[-1].tail = "\n    "
         del new.attrib["derivedFrom"]
         old.set("derivedFrom", pnew)
         for p in parent.findall(f"./peripheral[@derivedFrom='{pold}']"):
@@ -786,6 +876,32 @@ class Peripheral:
     def __init__(self, ptag):
         self.ptag = ptag
         self.name = get_element_name(self.ptag, "peripheral")
+        # Built on demand by register_index(); reset to None by every method
+        # which adds, removes or renames registers.
+        self._registers = None
+        self._size = None
+
+    def register_index(self):
+        """
+        Returns (name, rtag) pairs for all registers living directly inside
+        ptag, in document order. `register`s owned by `cluster`s are not
+        included.
+        """
+        if self._registers is None:
+            self._registers = [
+                (rtag.findtext("name"), rtag)
+                for rtag in self.ptag.iterfind("registers/register")
+            ]
+        return self._registers
+
+    def register_size(self):
+        """
+        Returns the size in bits of registers living directly inside ptag
+        which don't specify their own.
+        """
+        if self._size is None:
+            self._size = get_inherited_size(self.ptag)
+        return self._size
 
     def iter_registers(self, rspec):
         """
@@ -793,12 +909,7 @@ class Peripheral:
 
         Ignore `register`s owned by `cluster`s.
         """
-        for rtag in self.ptag.iter("register"):
-            parent = rtag.getparent()
-            assert isinstance(parent, Element), "Register must have parent."
-            if parent.tag == "cluster":
-                continue
-            name = rtag.find("name").text
+        for name, rtag in self.register_index():
             if matchname(name, rspec):
                 yield rtag
 
@@ -810,15 +921,15 @@ class Peripheral:
 
         Ignore `register`s owned by `cluster`s.
         """
-        for rtag in self.iter_registers("*"):
-            name = rtag.find("name").text
-            if matchname(name, rspec):
-                yield (rtag, matchsubspec(name, rspec))
+        for name, rtag in self.register_index():
+            match_rspec = matchsubspec(name, rspec)
+            if match_rspec is not None:
+                yield (rtag, match_rspec)
 
     def iter_interrupts(self, ispec):
         """Iterates over all interrupts matching ispec"""
-        for itag in self.ptag.iter("interrupt"):
-            name = itag.find("name").text
+        for itag in self.ptag.iterfind("interrupt"):
+            name = itag.findtext("name")
             if matchname(name, ispec):
                 yield itag
 
@@ -827,18 +938,16 @@ class Peripheral:
         Iterate over all clusters that match cpsec and live inside ptag.
         """
         for ctag in self.ptag.iter("cluster"):
-            name = ctag.find("name").text
+            name = ctag.findtext("name")
             if matchname(name, cspec):
                 yield ctag
 
     def add_interrupt(self, iname, iadd):
         """Add iname given by iadd to ptag."""
-        for itag in self.ptag.iter("interrupt"):
-            if itag.find("name").text == iname:
+        for itag in self.ptag.iterfind("interrupt"):
+            if itag.findtext("name") == iname:
                 raise SvdPatchError(
-                    "peripheral {} already has an interrupt {}".format(
-                        self.ptag.find("name").text, iname
-                    )
+                    "peripheral {} already has an interrupt {}".format(self.name, iname)
                 )
         inew = ET.SubElement(self.ptag, "interrupt")
         ET.SubElement(inew, "name").text = iname
@@ -872,29 +981,31 @@ class Peripheral:
                     if tag is None:
                         tag = ET.SubElement(rtag, key)
                     tag.text = str(value)
+        if "name" in rmod:
+            self._registers = None
 
     def add_register(self, rname, radd):
         """Add rname given by radd to ptag."""
         parent = self.ptag.find("registers")
         if parent is None:
             parent = ET.SubElement(self.rtag, "registers")
-        for rtag in self.iter_registers("*"):
-            if rtag.find("name").text == rname:
+        for name, _ in self.register_index():
+            if name == rname:
                 raise SvdPatchError(
-                    "peripheral {} already has a register {}".format(
-                        self.ptag.find("name").text, rname
-                    )
+                    "peripheral {} already has a register {}".format(self.name, rname)
                 )
         rnew = ET.SubElement(parent, "register")
         ET.SubElement(rnew, "name").text = rname
         for key, value in radd.items():
             if key == "fields":
                 ET.SubElement(rnew, "fields")
+                r = Register(rnew)
                 for fname in value:
-                    Register(rnew).add_field(fname, value[fname])
+                    r.add_field(fname, value[fname])
             else:
                 ET.SubElement(rnew, key).text = str(value)
         rnew.tail = "\n        "
+        self._registers = None
 
     def derive_register(self, rname, rmod):
         """
@@ -929,12 +1040,11 @@ class Peripheral:
                 rtag.find("addressOffset").text = hex(address_offset)
             if description:
                 rtag.find("description").text = description
-        for value in rtag:
-            last = value
-        last.tail = "\n    "
+        rtag[-1].tail = "\n    "
         rtag.set("derivedFrom", rderive)
         for p in parent.findall(f"./register[@derivedFrom='{rname}']"):
             p.set("derivedFrom", rderive)
+        self._registers = None
 
     def copy_register(self, rname, rderive):
         """Add rname given by deriving from rsource to ptag"""
@@ -945,20 +1055,16 @@ class Peripheral:
             )
         srcname = rderive["_from"]
         source = None
-        for rtag in self.iter_registers("*"):
-            if rtag.find("name").text == rname:
+        for name, rtag in self.register_index():
+            if name == rname:
                 raise SvdPatchError(
-                    "peripheral {} already has a register {}".format(
-                        self.ptag.find("name").text, rname
-                    )
+                    "peripheral {} already has a register {}".format(self.name, rname)
                 )
-            if rtag.find("name").text == srcname:
+            if name == srcname:
                 source = rtag
         if source is None:
             raise SvdPatchError(
-                "peripheral {} does not have register {}".format(
-                    self.ptag.find("name").text, srcname
-                )
+                "peripheral {} does not have register {}".format(self.name, srcname)
             )
         rcopy = copy.deepcopy(source)
         rcopy.find("name").text = rname
@@ -974,11 +1080,14 @@ class Peripheral:
             else:
                 rcopy.find(key).text = str(value)
         parent.append(rcopy)
+        self._registers = None
 
     def delete_register(self, rspec):
         """Delete registers matched by rspec inside ptag."""
+        parent = self.ptag.find("registers")
         for rtag in list(self.iter_registers(rspec)):
-            self.ptag.find("registers").remove(rtag)
+            parent.remove(rtag)
+        self._registers = None
 
     def add_cluster(self, cname: str, cadd: OrderedDict[str, Any]) -> None:
         """Add `cname` given by `cadd` to `ptag`."""
@@ -1017,11 +1126,7 @@ class Peripheral:
         beginning of the name by default.
         """
         regex = create_regex_from_pattern(substr, strip_end)
-        for rtag in self.iter_registers("*"):
-            parent = rtag.getparent()
-            assert isinstance(parent, Element), "Register must have parent."
-            if parent.tag == "cluster":
-                continue
+        for _, rtag in self.register_index():
             nametag = rtag.find("name")
             nametag.text = regex.sub("", nametag.text)
 
@@ -1032,13 +1137,14 @@ class Peripheral:
             alttag = rtag.find("alternateRegister")
             if alttag is not None:
                 alttag.text = regex.sub("", alttag.text)
+        self._registers = None
 
     def collect_in_array(self, rspec, rmod):
         """Collect same registers in peripheral into register array."""
         registers = []
         rspec, ignore = get_spec(rspec)
         li, ri = spec_ind(rspec)
-        for rtag in list(self.iter_registers(rspec)):
+        for rtag in self.iter_registers(rspec):
             rname = rtag.findtext("name")
             registers.append(
                 [
@@ -1054,7 +1160,7 @@ class Peripheral:
             raise SvdPatchError(
                 "{}: registers {} not found".format(self.ptag.findtext("name"), rspec)
             )
-        registers = sorted(registers, key=lambda r: r[2])
+        registers = sorted(registers, key=itemgetter(2))
 
         if rmod.get("_start_from_zero"):
             dimIndex = ",".join([str(i) for i in range(dim)])
@@ -1063,7 +1169,9 @@ class Peripheral:
         else:
             dimIndex = ",".join(r[1] for r in registers)
         offsets = [r[2] for r in registers]
-        bitmasks = [Register(r[0]).get_bitmask() for r in registers]
+        bitmasks = [
+            Register(r[0], self.register_size()).get_bitmask() for r in registers
+        ]
         dimIncrement = 0
         if dim > 1:
             dimIncrement = offsets[1] - offsets[0]
@@ -1077,8 +1185,9 @@ class Peripheral:
                     self.ptag.findtext("name"), rspec
                 )
             )
+        parent = self.ptag.find("registers")
         for rtag, _, _ in registers[1:]:
-            self.ptag.find("registers").remove(rtag)
+            parent.remove(rtag)
         rtag = registers[0][0]
         nametag = rtag.find("name")
         if "name" in rmod:
@@ -1095,6 +1204,7 @@ class Peripheral:
                 nametag.text[li : len(nametag.text) - ri], "%s"
             )
         nametag.text = name
+        self._registers = None
         self.process_register(name, rmod)
         ET.SubElement(rtag, "dim").text = str(dim)
         ET.SubElement(rtag, "dimIncrement").text = hex(dimIncrement)
@@ -1110,7 +1220,7 @@ class Peripheral:
             rmod = cmod[rspec]
             rspec, ignore = get_spec(rspec)
             registers = []
-            for rtag, match_rspec in list(self.iter_registers_with_matches(rspec)):
+            for rtag, match_rspec in self.iter_registers_with_matches(rspec):
                 rname = rtag.findtext("name")
                 li, ri = spec_ind(match_rspec)
                 registers.append(
@@ -1126,9 +1236,11 @@ class Peripheral:
                 raise SvdPatchError(
                     "{}: registers {rspec} not found".format(self.ptag.findtext("name"))
                 )
-            registers = sorted(registers, key=lambda r: r[2])
+            registers = sorted(registers, key=itemgetter(2))
             rdict[rspec] = (rmod, registers)
-            bitmasks = [Register(r[0]).get_bitmask() for r in registers]
+            bitmasks = [
+                Register(r[0], self.register_size()).get_bitmask() for r in registers
+            ]
             if first:
                 dim = len(registers)
                 dimIndex = ",".join([r[1] for r in registers])
@@ -1164,7 +1276,8 @@ class Peripheral:
                     self.ptag.findtext("name"), cname
                 )
             )
-        ctag = ET.SubElement(self.ptag.find("registers"), "cluster")
+        parent = self.ptag.find("registers")
+        ctag = ET.SubElement(parent, "cluster")
         addressOffset = min([registers[0][2] for _, (_, registers) in rdict.items()])
         ET.SubElement(ctag, "name").text = cname
         if "description" in cmod:
@@ -1175,29 +1288,32 @@ class Peripheral:
         ET.SubElement(ctag, "addressOffset").text = hex(addressOffset)
         for rspec, (rmod, registers) in rdict.items():
             for rtag, _, _ in registers[1:]:
-                self.ptag.find("registers").remove(rtag)
+                parent.remove(rtag)
+            self._registers = None
             rtag = registers[0][0]
             self.process_register(rspec, rmod)
-            new_rtag = copy.deepcopy(rtag)
-            self.ptag.find("registers").remove(rtag)
+            # The register moves into the cluster, so detach it rather than
+            # copying it.
+            parent.remove(rtag)
+            self._registers = None
             if "name" in rmod:
                 name = rmod["name"]
             else:
                 li, ri = spec_ind(rspec)
                 name = rspec[:li] + rspec[len(rspec) - ri :]
-            new_rtag.find("name").text = name
+            rtag.find("name").text = name
             if "description" in rmod:
                 rtag.find("description").text = rmod["description"]
-            offset = new_rtag.find("addressOffset")
+            offset = rtag.find("addressOffset")
             offset.text = hex(int(offset.text, 0) - addressOffset)
-            ctag.append(new_rtag)
+            ctag.append(rtag)
         ET.SubElement(ctag, "dim").text = str(dim)
         ET.SubElement(ctag, "dimIncrement").text = hex(dimIncrement)
         ET.SubElement(ctag, "dimIndex").text = dimIndex
 
     def clear_fields(self, rspec):
         """Clear contents of all fields inside registers matched by rspec"""
-        for rtag in list(self.iter_registers(rspec)):
+        for rtag in self.iter_registers(rspec):
             if "derivedFrom" in rtag.attrib:
                 continue
             r = Register(rtag)
@@ -1207,7 +1323,18 @@ class Peripheral:
         """Work through a register, handling all fields."""
         # Find all registers that match the spec
         rspec, ignore = get_spec(rspec)
-        pname = self.ptag.find("name").text
+        pname = self.name
+        # Look the actions up once rather than for every matching register.
+        deletions = register.get("_delete", [])
+        prefixes = register.get("_strip", [])
+        suffixes = register.get("_strip_end", [])
+        clears = register.get("_clear", [])
+        modifications = register.get("_modify", [])
+        additions = register.get("_add", [])
+        merges = register.get("_merge", [])
+        splits = register.get("_split", [])
+        arrays = register.get("_array", {})
+        fspecs = [fspec for fspec in register if not fspec.startswith("_")]
         rcount = 0
         for rtag in self.iter_registers(rspec):
             rcount += 1
@@ -1215,49 +1342,40 @@ class Peripheral:
                 continue
             r = Register(rtag)
             # Handle deletions
-            for fspec in register.get("_delete", []):
+            for fspec in deletions:
                 r.delete_field(fspec)
             # Handle strips
-            for prefix in register.get("_strip", []):
+            for prefix in prefixes:
                 r.strip(prefix)
-            for suffix in register.get("_strip_end", []):
+            for suffix in suffixes:
                 r.strip(suffix, strip_end=True)
             # Handle field clearing
-            for fspec in register.get("_clear", []):
+            for fspec in clears:
                 r.clear_field(fspec)
             # Handle modifications
-            for fspec in register.get("_modify", []):
-                fmod = register["_modify"][fspec]
+            for fspec in modifications:
+                fmod = modifications[fspec]
                 r.modify_field(fspec, fmod)
             # Handle additions
-            for fname in register.get("_add", []):
-                fadd = register["_add"][fname]
+            for fname in additions:
+                fadd = additions[fname]
                 r.add_field(fname, fadd)
             # Handle merges
-            for fspec in register.get("_merge", []):
-                fmerge = (
-                    register["_merge"][fspec]
-                    if isinstance(register["_merge"], dict)
-                    else None
-                )
+            for fspec in merges:
+                fmerge = merges[fspec] if isinstance(merges, dict) else None
                 r.merge_fields(fspec, fmerge)
             # Handle splits
-            for fspec in register.get("_split", []):
-                fsplit = (
-                    register["_split"][fspec]
-                    if isinstance(register["_split"], dict)
-                    else {}
-                )
+            for fspec in splits:
+                fsplit = splits[fspec] if isinstance(splits, dict) else {}
                 r.split_fields(fspec, fsplit)
             # Handle fields
             if update_fields:
-                for fspec in register:
-                    if not fspec.startswith("_"):
-                        field = register[fspec]
-                        r.process_field(pname, fspec, field)
+                for fspec in fspecs:
+                    field = register[fspec]
+                    r.process_field(pname, fspec, field)
             # Handle field arrays
-            for fspec in register.get("_array", {}):
-                fmod = register["_array"][fspec]
+            for fspec in arrays:
+                fmod = arrays[fspec]
                 r.collect_fields_in_array(fspec, fmod)
         if not ignore and rcount == 0:
             raise MissingRegisterError(f"Could not find {pname}:{rspec}")
@@ -1337,8 +1455,9 @@ class Cluster:
         for key, value in radd.items():
             if key == "fields":
                 ET.SubElement(rnew, "fields")
+                r = Register(rnew)
                 for fname in value:
-                    Register(rnew).add_field(fname, value[fname])
+                    r.add_field(fname, value[fname])
             else:
                 ET.SubElement(rnew, key).text = str(value)
         rnew.tail = "\n        "
@@ -1379,31 +1498,50 @@ class Cluster:
                 alttag.text = regex.sub("", alttag.text)
 
 
+def get_inherited_size(tag):
+    """
+    Return the size in bits given by tag or its closest ancestor which
+    specifies one, or 32 if none does.
+    """
+    while tag is not None:
+        size = tag.findtext("size")
+        if size is not None:
+            return int(size, 0)
+        tag = tag.getparent()
+    return 32
+
+
 def sorted_fields(fields):
-    return sorted(fields, key=lambda ftag: get_field_offset_width(ftag)[0])
+    offsets = [get_field_offset_width(ftag)[0] for ftag in fields]
+    # Fields are usually listed in bit order already.
+    if all(o1 <= o2 for o1, o2 in zip(offsets, offsets[1:])):
+        return list(fields)
+    pairs = sorted(zip(offsets, fields), key=itemgetter(0))
+    return [ftag for _, ftag in pairs]
 
 
 class Register:
     """Class collecting methods for processing register contents"""
 
-    def __init__(self, rtag):
+    def __init__(self, rtag, default_size=None):
         self.rtag = rtag
+        # Size inherited from the enclosing elements, if the caller already
+        # knows it; otherwise size() walks up the tree to find it.
+        self.default_size = default_size
+        # Names of the fields inside rtag, built on demand by add_field() and
+        # reset to None by every method which removes or renames fields.
+        self._field_names = None
 
     def size(self):
         """
         Look up register size in bits.
         """
-        size = None
-        tag = self.rtag
-        while size is None:
-            size = tag.findtext("size")
-            tag = tag.getparent()
-            if tag is None:
-                break
-        if size is None:
-            return 32
-        else:
+        size = self.rtag.findtext("size")
+        if size is not None:
             return int(size, 0)
+        if self.default_size is not None:
+            return self.default_size
+        return get_inherited_size(self.rtag.getparent())
 
     def iter_fields(self, fspec):
         """
@@ -1411,8 +1549,8 @@ class Register:
         """
         fields = self.rtag.find("fields")
         if fields is not None:
-            for ftag in fields.iter("field"):
-                name = ftag.find("name").text
+            for ftag in fields.iterfind("field"):
+                name = ftag.findtext("name")
                 if matchname(name, fspec):
                     yield ftag
 
@@ -1422,13 +1560,14 @@ class Register:
         beginning of the name by default.
         """
         regex = create_regex_from_pattern(substr, strip_end)
-        for ftag in self.rtag.iter("field"):
+        for ftag in self.rtag.iterfind("fields/field"):
             nametag = ftag.find("name")
             nametag.text = regex.sub("", nametag.text)
 
             dnametag = ftag.find("displayName")
             if dnametag is not None:
                 dnametag.text = regex.sub("", dnametag.text)
+        self._field_names = None
 
     def modify_field(self, fspec, fmod):
         """Modify fspec inside rtag according to fmod."""
@@ -1463,33 +1602,41 @@ class Register:
                 else:
                     # For all other tags, just set the value
                     tag.text = str(value)
+        if "name" in fmod:
+            self._field_names = None
 
     def add_field(self, fname, fadd):
         """Add fname given by fadd to rtag."""
         parent = self.rtag.find("fields")
         if parent is None:
             parent = ET.SubElement(self.rtag, "fields")
-        for ftag in parent.iter("field"):
-            if ftag.find("name").text == fname:
-                raise SvdPatchError(
-                    "register {} already has a field {}".format(
-                        self.rtag.find("name").text, fname
-                    )
+        if self._field_names is None:
+            self._field_names = {
+                ftag.findtext("name") for ftag in parent.iterfind("field")
+            }
+        if fname in self._field_names:
+            raise SvdPatchError(
+                "register {} already has a field {}".format(
+                    self.rtag.find("name").text, fname
                 )
+            )
         fnew = ET.SubElement(parent, "field")
         ET.SubElement(fnew, "name").text = fname
         for key, value in fadd.items():
             ET.SubElement(fnew, key).text = str(value)
         fnew.tail = "\n            "
+        self._field_names.add(fname)
 
     def delete_field(self, fspec):
         """Delete fields matched by fspec inside rtag."""
+        parent = self.rtag.find("fields")
         for ftag in list(self.iter_fields(fspec)):
-            self.rtag.find("fields").remove(ftag)
+            parent.remove(ftag)
+        self._field_names = None
 
     def clear_field(self, fspec):
         """Clear contents of fields matched by fspec inside rtag."""
-        for ftag in list(self.iter_fields(fspec)):
+        for ftag in self.iter_fields(fspec):
             if "derivedFrom" in ftag.attrib:
                 continue
             for tag in ftag.findall("enumeratedValues"):
@@ -1515,7 +1662,7 @@ class Register:
             raise RegisterMergeError(f"Invalid usage of merge for {rname}.{key}")
         else:
             fields = list(self.iter_fields(key))
-            name = os.path.commonprefix([f.find("name").text for f in fields])
+            name = os.path.commonprefix([f.findtext("name") for f in fields])
         if len(fields) == 0:
             rname = self.rtag.find("name").text
             raise RegisterMergeError(
@@ -1523,8 +1670,9 @@ class Register:
             )
         parent = self.rtag.find("fields")
         desc = fields[0].find("description").text
-        bitwidth = sum(get_field_offset_width(f)[1] for f in fields)
-        bitoffset = min(get_field_offset_width(f)[0] for f in fields)
+        offset_widths = [get_field_offset_width(f) for f in fields]
+        bitwidth = sum(width for _, width in offset_widths)
+        bitoffset = min(offset for offset, _ in offset_widths)
         for field in fields:
             parent.remove(field)
         fnew = ET.SubElement(parent, "field")
@@ -1532,13 +1680,14 @@ class Register:
         ET.SubElement(fnew, "description").text = desc
         ET.SubElement(fnew, "bitOffset").text = str(bitoffset)
         ET.SubElement(fnew, "bitWidth").text = str(bitwidth)
+        self._field_names = None
 
     def collect_fields_in_array(self, fspec, fmod):
         """Collect same fields in peripheral into register array."""
         fields = []
         fspec, ignore = get_spec(fspec)
         li, ri = spec_ind(fspec)
-        for ftag in list(self.iter_fields(fspec)):
+        for ftag in self.iter_fields(fspec):
             fname = ftag.findtext("name")
             fields.append(
                 [ftag, fname[li : len(fname) - ri], get_field_offset_width(ftag)[0]]
@@ -1550,7 +1699,7 @@ class Register:
             raise SvdPatchError(
                 "{}: fields {} not found".format(self.rtag.findtext("name"), fspec)
             )
-        fields = sorted(fields, key=lambda f: f[2])
+        fields = sorted(fields, key=itemgetter(2))
 
         if fmod.get("_start_from_zero"):
             dimIndex = ",".join([str(i) for i in range(dim)])
@@ -1569,8 +1718,9 @@ class Register:
                     self.rtag.findtext("name"), fspec
                 )
             )
+        parent = self.rtag.find("fields")
         for ftag, _, _ in fields[1:]:
-            self.rtag.find("fields").remove(ftag)
+            parent.remove(ftag)
         ftag = fields[0][0]
         nametag = ftag.find("name")
         if "name" in fmod:
@@ -1587,6 +1737,7 @@ class Register:
                 nametag.text[li : len(nametag.text) - ri], "%s"
             )
         nametag.text = name
+        self._field_names = None
         # self.process_field(name, fmod)
         ET.SubElement(ftag, "dim").text = str(dim)
         ET.SubElement(ftag, "dimIndex").text = dimIndex
@@ -1610,13 +1761,14 @@ class Register:
         if isinstance(fsplit, dict) and "name" in fsplit:
             name = fsplit["name"]
         else:
-            name = os.path.commonprefix([f.find("name").text for f in fields]) + "%s"
+            name = os.path.commonprefix([f.findtext("name") for f in fields]) + "%s"
         if isinstance(fsplit, dict) and "description" in fsplit:
             desc = fsplit["description"]
         else:
             desc = fields[0].find("description").text
-        bitoffset = get_field_offset_width(fields[0])[0]
-        bitwidth = sum(get_field_offset_width(f)[1] for f in fields)
+        offset_widths = [get_field_offset_width(f) for f in fields]
+        bitoffset = offset_widths[0][0]
+        bitwidth = sum(width for _, width in offset_widths)
         parent.remove(fields[0])
         for i in range(bitwidth):
             fnew = ET.SubElement(parent, "field")
@@ -1624,6 +1776,7 @@ class Register:
             ET.SubElement(fnew, "description").text = desc.replace("%s", str(i))
             ET.SubElement(fnew, "bitOffset").text = str(bitoffset + i)
             ET.SubElement(fnew, "bitWidth").text = str(1)
+        self._field_names = None
 
     def process_field(self, pname, fspec, fmod):
         """Work through a field, handling either an enum or a range."""
@@ -1716,7 +1869,7 @@ class Register:
             elif "_name" in field:
                 name = field["_name"]
             else:
-                name = ftag.find("name").text
+                name = ftag.findtext("name")
 
             if derived is None:
                 if enum is None:
@@ -1738,8 +1891,8 @@ class Register:
                         # This is a derived enumeratedValues => Try to find the
                         # original definition to extract its <usage>
                         derived_name = ev.attrib["derivedFrom"]
-                        derived_enums = self.rtag.findall(
-                            f"./fields/field/enumeratedValues/[name='{derived_name}']"
+                        derived_enums = XPATH_ENUMERATED_VALUES(
+                            self.rtag, name=derived_name
                         )
 
                         if derived_enums == []:
@@ -1772,8 +1925,10 @@ class Register:
         """Add a writeConstraint range given by field to all fspec in rtag."""
         fspec, ignore = get_spec(fspec)
         set_any = False
+        # Copying a ready-made constraint is about twice as fast as building it.
+        constraint = make_write_constraint(field)
         for ftag in self.iter_fields(fspec):
-            ftag.append(make_write_constraint(field))
+            ftag.append(copy.deepcopy(constraint))
             set_any = True
         if not ignore and not set_any:
             rname = self.rtag.find("name").text
@@ -1784,7 +1939,8 @@ class Register:
         mask = 0x0
         size = self.size()
         full_mask = (1 << size) - 1
-        for ftag in self.iter_fields("*"):
+        # Every field counts, so skip matching their names against "*".
+        for ftag in self.rtag.iterfind("fields/field"):
             foffset, fwidth = get_field_offset_width(ftag)
             mask |= (full_mask >> (size - fwidth)) << foffset
         return mask
@@ -1849,7 +2005,7 @@ def process_device(svd, device, update_fields=True):
 def main(yaml_file):
     # Load the specified YAML root file
     with open(yaml_file) as f:
-        root = yaml.safe_load(f)
+        root = yaml.load(f, Loader=YamlLoader)
         root["_path"] = yaml_file
 
     # Load the specified SVD file
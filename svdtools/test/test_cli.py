@@ -0,0 +1,16 @@
+import click
+from click.testing import CliRunner
+
+import svdtools
+
+from ..cli import svdtools_cli
+
+
+def test_svdtools_cli_group():
+    assert isinstance(svdtools_cli, click.Group)
+    assert "mmap" in svdtools_cli.commands
+
+    result = CliRunner().invoke(svdtools_cli, ["version"])
+
+    assert result.exit_code == 0
+    assert result.output == f"{svdtools.__version__}\n"
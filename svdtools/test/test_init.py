@@ -0,0 +1,34 @@
+import os.path
+import subprocess
+import sys
+
+import svdtools
+
+CODE = """
+import sys
+import svdtools
+print(" ".join(sorted(m for m in sys.modules if m.split(".")[0] in {MODULES})))
+"""
+
+
+def test_lazy_imports():
+    # Run in a fresh interpreter, as the test session has imported everything.
+    modules = {"svdtools", "click", "lxml", "yaml", "braceexpand"}
+    root = os.path.dirname(os.path.dirname(svdtools.__file__))
+
+    result = subprocess.run(
+        [sys.executable, "-c", CODE.replace("{MODULES}", repr(modules))],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout.split() == ["svdtools", "svdtools._version"]
+
+
+def test_submodule_access():
+    assert svdtools.interrupts.main is not None
+    assert "patch" in dir(svdtools)
+    # Submodules already imported are globals too, but are only listed once.
+    assert len(dir(svdtools)) == len(set(dir(svdtools)))
@@ -1,6 +1,7 @@
 import os.path
 
 from ..interrupts import main as interrupts
+from ..interrupts import parse_device
 
 SVD = """
 <device>
@@ -41,3 +42,18 @@ def test_interrupts(tmpdir):
     result = interrupts(svd_file)
 
     assert result == INTERRUPTS
+
+
+def test_parse_device(tmpdir):
+    svd_file = os.path.join(tmpdir, "test.svd")
+
+    with open(svd_file, "w") as f:
+        f.write(SVD)
+
+    name, result = parse_device(svd_file)
+
+    assert name == "Test Device"
+    assert result == {
+        1: {"name": "INT_A1", "desc": "Interrupt A1", "pname": "PeriphA"},
+        3: {"name": "INT_B3", "desc": "Interrupt B3", "pname": "PeriphB"},
+    }
@@ -2,6 +2,7 @@ import os.path
 
 import yaml
 
+from .. import patch
 from ..makedeps import main as makedeps
 
 
@@ -28,3 +29,52 @@ def test_makedeps(tmpdir):
         deps = f.read()
 
     assert deps == f"{deps_file}: {inc1_file} {inc2_file}\n"
+
+
+def test_makedeps_cache(tmpdir, monkeypatch):
+    yaml_file = os.path.join(tmpdir, "test.yaml")
+    inc1_file = os.path.join(tmpdir, "inc1.yaml")
+    inc2_file = os.path.join(tmpdir, "inc2.yaml")
+    deps_file = os.path.join(tmpdir, "test.d")
+
+    with open(yaml_file, "w") as f:
+        yaml.safe_dump({"_include": ["inc1.yaml"]}, f)
+    with open(inc1_file, "w") as f:
+        yaml.safe_dump({}, f)
+
+    calls = []
+    yaml_includes = patch.yaml_includes
+
+    # yaml_includes recurses through the module attribute, so every file
+    # walked is recorded, not just the root.
+    def counting_yaml_includes(device):
+        calls.append(device["_path"])
+        return yaml_includes(device)
+
+    monkeypatch.setattr(patch, "yaml_includes", counting_yaml_includes)
+
+    makedeps(yaml_file, deps_file)
+    assert os.path.exists(f"{deps_file}.cache")
+    assert calls == [yaml_file, inc1_file]
+
+    # Nothing changed, so the second run is answered from the cache.
+    makedeps(yaml_file, deps_file)
+    assert calls == [yaml_file, inc1_file]
+    with open(deps_file) as f:
+        assert f.read() == f"{deps_file}: {inc1_file}\n"
+
+    # Touching an include must invalidate the cached dependency list.
+    with open(inc1_file, "w") as f:
+        yaml.safe_dump({"_include": ["inc2.yaml"]}, f)
+    with open(inc2_file, "w") as f:
+        yaml.safe_dump({}, f)
+    stat = os.stat(inc1_file)
+    os.utime(inc1_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    makedeps(yaml_file, deps_file)
+    assert calls == [yaml_file, inc1_file] * 2 + [inc2_file]
+
+    with open(deps_file) as f:
+        deps = f.read()
+
+    assert deps == f"{deps_file}: {inc1_file} {inc2_file}\n"
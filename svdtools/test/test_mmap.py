@@ -1,6 +1,9 @@
-import os.path
+import io
+
+import pytest
 
 from ..mmap import main as mmap
+from ..mmap import mmap_from_bytes, write_lines
 
 SVD = """
 <device>
@@ -79,12 +82,41 @@ INTERRUPT 002: INT_B2 (PeriphB): Interrupt B2\
 """
 
 
-def test_mmap(tmpdir):
-    svd_file = os.path.join(tmpdir, "test.svd")
+@pytest.fixture(scope="session")
+def svd_path(tmp_path_factory):
+    svd_file = tmp_path_factory.mktemp("svd") / "test.svd"
+    svd_file.write_text(SVD)
+    return str(svd_file)
+
+
+def test_mmap():
+    result = mmap_from_bytes(SVD.encode("utf-8"))
+
+    assert result.splitlines() == MMAP.splitlines()
+
+
+def test_mmap_path(svd_path):
+    result = mmap(svd_path)
+
+    assert result.splitlines() == MMAP.splitlines()
+
+
+def test_mmap_write_lines(svd_path):
+    out = io.BytesIO()
+
+    write_lines(svd_path, out, bufsize=64)
+
+    assert out.getvalue().decode("utf-8").splitlines() == MMAP.splitlines()
+
 
-    with open(svd_file, "w") as f:
-        f.write(SVD)
+def test_mmap_lsb_msb():
+    svd = SVD.replace(
+        "<bitOffset>10</bitOffset>\n"
+        "                            <bitWidth>1</bitWidth>",
+        "<lsb>10</lsb>\n                            <msb>11</msb>",
+    )
 
-    result = mmap(svd_file)
+    result = mmap_from_bytes(svd.encode("utf-8"))
 
-    assert result == MMAP
+    expected = MMAP.replace("FIELD 10w01", "FIELD 10w02")
+    assert result.splitlines() == expected.splitlines()
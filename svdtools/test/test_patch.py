@@ -0,0 +1,287 @@
+import lxml.etree as ET
+import pytest
+
+from .. import patch
+
+
+@pytest.mark.parametrize(
+    "name, spec, subspec",
+    [
+        ("CR1", "CR1", "CR1"),
+        ("CR1", "CR2", None),
+        ("cr1", "CR1", None),
+        ("CR1", "CR1,CR2", "CR1"),
+        ("CR2", "CR1,CR2", "CR2"),
+        ("CR3", "CR1,CR2", None),
+        ("DMA_CCR1", "DMA_CCR*", "DMA_CCR*"),
+        ("DMA_CCR", "DMA_CCR*", "DMA_CCR*"),
+        ("DMA_CCR1", "DMA_CCR?", "DMA_CCR?"),
+        ("DMA_CCR12", "DMA_CCR?", None),
+        ("DMA_CCR3", "DMA_CCR[1-3]", "DMA_CCR[1-3]"),
+        ("DMA_CCR4", "DMA_CCR[1-3]", None),
+        ("DMA_CCR4", "DMA_CCR[!1-3]", "DMA_CCR[!1-3]"),
+        ("GPIOA", "GPIO[AB],TIM*", "GPIO[AB]"),
+        ("TIM1", "GPIO[AB],TIM*", "TIM*"),
+        ("TIM2", "TIM{2,3}", "TIM2"),
+        ("TIM4", "TIM{2,3}", None),
+        ("TIM3_CR", "TIM{2,3}_*", "TIM3_*"),
+        ("CR1", "_CR1", None),
+        ("_add", "_add", None),
+    ],
+)
+def test_matchname(name, spec, subspec):
+    assert patch.matchname(name, spec) == (subspec is not None)
+    assert patch.matchsubspec(name, spec) == subspec
+
+
+def test_matchname_optional_spec():
+    with pytest.raises(patch.SvdPatchError):
+        patch.matchname("CR1", "?~CR*")
+
+
+@pytest.mark.parametrize(
+    "spec, indices",
+    [
+        ("CR1", (None, None)),
+        ("2CCR", (None, None)),
+        ("CCR?", (3, 0)),
+        ("1CCR*", (4, 0)),
+        ("CCR*1", (3, 1)),
+        ("CH*_CR", (2, 3)),
+        ("CH[12]_CR", (2, 3)),
+        ("CH*_CR,DMA?", (2, 3)),
+        ("*_CR?", (0, 4)),
+    ],
+)
+def test_spec_ind(spec, indices):
+    assert patch.spec_ind(spec) == indices
+
+
+@pytest.mark.parametrize(
+    "offsets, dim_increment, expected",
+    [
+        # Adjacent registers, exactly one dimIncrement apart.
+        ([0x0, 0x4, 0x8], 4, True),
+        ([0x0, 0x4, 0x8], 8, False),
+        # Overlapping registers, closer together than dimIncrement.
+        ([0x0, 0x2, 0x4], 4, False),
+        ([0x0, 0x4, 0x4], 4, False),
+        # Disjoint registers with a gap in the sequence.
+        ([0x0, 0x8, 0xC], 4, False),
+        ([0x8, 0x4, 0x0], 4, False),
+        ([0x8, 0x4, 0x0], -4, True),
+        ([0x10], 4, True),
+        ([], 4, True),
+        ([0x0, 0x0], 0, True),
+        ([0x0, 0x4], 0, False),
+    ],
+)
+def test_check_offsets(offsets, dim_increment, expected):
+    assert patch.check_offsets(offsets, dim_increment) == expected
+
+
+@pytest.mark.parametrize(
+    "masks, mask, expected",
+    [
+        ([0xFF, 0xFF, 0xFF], 0xFF, True),
+        ([0xFF, 0x0F, 0xFF], 0xFF, False),
+        ([0x0F, 0x0F], 0xFF, False),
+        ([], 0xFF, True),
+    ],
+)
+def test_check_bitmasks(masks, mask, expected):
+    assert patch.check_bitmasks(masks, mask) == expected
+
+
+def test_update_dict():
+    parent = {
+        "_path": "device.yaml",
+        "PERIPH": {"REG": {"FIELD": [0, 1]}, "_delete": ["OLD"]},
+        "_modify": {"name": "PARENT"},
+        "list": ["a"],
+    }
+    child = {
+        "_path": "child.yaml",
+        "_include": ["other.yaml"],
+        "PERIPH": {"REG": {"FIELD": [2, 3], "OTHER": [0, 1]}, "_delete": ["GONE"]},
+        "_modify": {"name": "CHILD", "description": "Child"},
+        "list": ["b", "c"],
+        "NEW": {"_strip": ["X_"]},
+    }
+
+    patch.update_dict(parent, child)
+
+    assert parent == {
+        "_path": "device.yaml",
+        "PERIPH": {
+            "REG": {"FIELD": [0, 1, 2, 3], "OTHER": [0, 1]},
+            "_delete": ["OLD", "GONE"],
+        },
+        "_modify": {"name": "PARENT", "description": "Child"},
+        "list": ["a", "b", "c"],
+        "NEW": {"_strip": ["X_"]},
+    }
+
+
+SVD = """
+<device>
+    <name>DEVICE</name>
+    <peripherals>
+        <peripheral>
+            <name>TIM1</name>
+            <baseAddress>0x40000000</baseAddress>
+            <registers>
+                <register>
+                    <name>TIM1_CR1</name>
+                    <addressOffset>0x0</addressOffset>
+                    <size>32</size>
+                    <fields>
+                        <field>
+                            <name>CEN</name>
+                            <bitOffset>0</bitOffset>
+                            <bitWidth>1</bitWidth>
+                        </field>
+                        <field>
+                            <name>UDIS</name>
+                            <bitOffset>1</bitOffset>
+                            <bitWidth>1</bitWidth>
+                        </field>
+                    </fields>
+                </register>
+                <register>
+                    <name>TIM1_SR</name>
+                    <addressOffset>0x10</addressOffset>
+                    <size>32</size>
+                </register>
+            </registers>
+        </peripheral>
+        <peripheral derivedFrom="TIM1">
+            <name>TIM2</name>
+            <baseAddress>0x40000400</baseAddress>
+        </peripheral>
+    </peripherals>
+</device>
+"""
+
+
+def make_svd():
+    return ET.ElementTree(ET.fromstring(SVD))
+
+
+def make_peripheral():
+    ptag = make_svd().find("peripherals/peripheral[name='TIM1']")
+    return patch.Peripheral(ptag)
+
+
+def register_offsets(peripheral, rspec):
+    return [rtag.findtext("addressOffset") for rtag in peripheral.iter_registers(rspec)]
+
+
+def test_peripheral_modify_register_name():
+    p = make_peripheral()
+    assert register_offsets(p, "*") == ["0x0", "0x10"]
+
+    p.modify_register("TIM1_SR", {"name": "TIM1_ISR"})
+
+    assert register_offsets(p, "TIM1_SR") == []
+    assert register_offsets(p, "TIM1_ISR") == ["0x10"]
+
+    # The old name is free again.
+    p.add_register("TIM1_SR", {"addressOffset": "0x14"})
+    assert register_offsets(p, "TIM1_SR") == ["0x14"]
+
+
+def test_peripheral_strip_registers():
+    p = make_peripheral()
+    assert register_offsets(p, "TIM1_CR1") == ["0x0"]
+
+    p.strip("TIM1_")
+
+    assert register_offsets(p, "TIM1_CR1") == []
+    assert register_offsets(p, "CR1") == ["0x0"]
+    assert register_offsets(p, "SR") == ["0x10"]
+
+
+def test_peripheral_delete_register():
+    p = make_peripheral()
+    assert register_offsets(p, "*") == ["0x0", "0x10"]
+
+    p.delete_register("TIM1_SR")
+
+    assert register_offsets(p, "*") == ["0x0"]
+    assert register_offsets(p, "TIM1_SR") == []
+
+
+def test_peripheral_add_register():
+    p = make_peripheral()
+    assert register_offsets(p, "*") == ["0x0", "0x10"]
+
+    p.add_register("TIM1_DIER", {"addressOffset": "0xC"})
+
+    assert register_offsets(p, "TIM1_DIER") == ["0xC"]
+    with pytest.raises(patch.SvdPatchError):
+        p.add_register("TIM1_DIER", {"addressOffset": "0xC"})
+
+
+def test_peripheral_copy_register():
+    p = make_peripheral()
+    assert register_offsets(p, "*") == ["0x0", "0x10"]
+
+    p.copy_register("TIM1_CR2", {"_from": "TIM1_CR1", "addressOffset": "0x4"})
+
+    assert register_offsets(p, "TIM1_CR1") == ["0x0"]
+    assert register_offsets(p, "TIM1_CR2") == ["0x4"]
+    with pytest.raises(patch.SvdPatchError):
+        p.copy_register("TIM1_CR2", {"_from": "TIM1_CR1"})
+
+
+def test_device_modify_peripheral_name():
+    d = patch.Device(make_svd())
+    tim1 = d.peripheral_index()["TIM1"]
+
+    d.modify_peripheral("TIM1", {"name": "TIM10"})
+    # The old name is free again.
+    d.add_peripheral("TIM1", {"baseAddress": "0x40000800"})
+
+    peripherals = d.peripheral_index()
+    assert peripherals["TIM10"] is tim1
+    assert peripherals["TIM1"].findtext("baseAddress") == "0x40000800"
+    assert peripherals["TIM2"].get("derivedFrom") == "TIM10"
+
+    # Derivation looks both peripherals up by their new names.
+    d.derive_peripheral("TIM1", "TIM10")
+    assert peripherals["TIM1"].get("derivedFrom") == "TIM10"
+    with pytest.raises(patch.SvdPatchError):
+        d.derive_peripheral("TIM3", "TIM4")
+
+
+def make_register():
+    rtag = make_svd().find(".//register[name='TIM1_CR1']")
+    return patch.Register(rtag)
+
+
+def field_offsets(register, fspec):
+    return [ftag.findtext("bitOffset") for ftag in register.iter_fields(fspec)]
+
+
+def test_register_add_field_after_rename():
+    r = make_register()
+    # Adding a field builds the cached set of field names.
+    r.add_field("ARPE", {"bitOffset": "7", "bitWidth": "1"})
+
+    r.modify_field("CEN", {"name": "COUNTER_EN"})
+    r.add_field("CEN", {"bitOffset": "8", "bitWidth": "1"})
+
+    assert field_offsets(r, "CEN") == ["8"]
+    assert field_offsets(r, "COUNTER_EN") == ["0"]
+
+
+def test_register_add_existing_field():
+    r = make_register()
+
+    with pytest.raises(patch.SvdPatchError):
+        r.add_field("UDIS", {"bitOffset": "1", "bitWidth": "1"})
+
+    r.add_field("ARPE", {"bitOffset": "7", "bitWidth": "1"})
+    with pytest.raises(patch.SvdPatchError):
+        r.add_field("ARPE", {"bitOffset": "7", "bitWidth": "1"})
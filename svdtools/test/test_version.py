@@ -0,0 +1,12 @@
+import os.path
+
+from .. import __version__
+
+
+def test_version():
+    version_file = os.path.join(os.path.dirname(__file__), os.pardir, "VERSION")
+
+    with open(version_file) as f:
+        version = f.read().strip()
+
+    assert __version__ == version